@@ -1,85 +1,293 @@
-from datetime import datetime
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import time
 
-import json
 import boto3
+import orjson
+from botocore.exceptions import ClientError
+
+_SQS_CLIENT = None
+_QUEUE_URLS = {}
+_LOGGER = None
+_LOG_MEMORY_HANDLER = None
+_LOG_LISTENER = None
+_LOG_FILE = None
+_LOG_FILE_EXPIRES_AT = 0.0
+_SCHEMA_CACHE = {}
+_VALIDATOR_CACHE = {}
 
 PATH = os.path.dirname(os.path.abspath(__file__))
 LOG_FOLDERNAME = "logs"
+LOG_BUFFER_CAPACITY = 1000
 SCHEMA_FILENAME = "schema.json"
+VALID_EVENTS_QUEUE = "valid-events-queue"
+SQS_BATCH_SIZE = 10
+SQS_MAX_BATCH_BYTES = 262144
 TYPE_MAPPING = {"string": str, "integer": int, "object": dict, "boolean": bool}
 
+def _get_queue_url(queue_name: str) -> str:
+    '''
+    Responsável pela obtenção da url da fila, reaproveitando o client e as urls já consultadas
+    :param queue_name: Nome da fila (str)
+    :return: Url da fila (str)
+    '''
+
+    global _SQS_CLIENT
+    if _SQS_CLIENT is None:
+        _SQS_CLIENT = boto3.client("sqs", region_name="us-east-1")
+
+    queue_url = _QUEUE_URLS.get(queue_name)
+    if queue_url is None:
+        response = _SQS_CLIENT.get_queue_url(
+            QueueName=queue_name
+        )
+        queue_url = _QUEUE_URLS[queue_name] = response['QueueUrl']
+
+    return queue_url
+
+
+def _serialize_event(event: dict) -> str:
+    '''
+    Responsável pela serialização do evento para o corpo da mensagem
+    Utiliza o json da biblioteca padrão quando o orjson não suporta o conteúdo. Ex: inteiros acima de 64 bits
+    :param event: Evento (dict)
+    :return: Evento serializado (str)
+    '''
+
+    try:
+        return orjson.dumps(event).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(event)
+
+
+def _chunk_entries(events: list):
+    '''
+    Responsável pela divisão dos eventos em lotes de até SQS_BATCH_SIZE entradas,
+    cujo tamanho somado não ultrapasse SQS_MAX_BATCH_BYTES
+    :param events: Eventos (list)
+    :return: Lotes de entradas: Id, MessageBody (generator)
+    '''
+
+    batch, batch_bytes = [], 0
+    for index, event in enumerate(events):
+        body = _serialize_event(event)
+        body_bytes = len(body.encode())
+        if batch and (len(batch) == SQS_BATCH_SIZE or batch_bytes + body_bytes > SQS_MAX_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append({"Id": str(index), "MessageBody": body})
+        batch_bytes += body_bytes
+
+    if batch:
+        yield batch
+
+
+def send_events_to_queue(events: list, queue_name: str) -> list:
+    '''
+    Responsável pelo envio de eventos para uma fila, em lotes de até SQS_BATCH_SIZE eventos
+    e SQS_MAX_BATCH_BYTES bytes. Um lote recusado por inteiro não interrompe o envio dos demais
+    :param events: Eventos (list)
+    :param queue_name: Nome da fila (str)
+    :return: Entradas recusadas pela fila: Id, Message (list)
+    '''
+
+    queue_url = _get_queue_url(queue_name)
+    failed_entries = []
+
+    for entries in _chunk_entries(events):
+        try:
+            response = _SQS_CLIENT.send_message_batch(QueueUrl=queue_url, Entries=entries)
+        except ClientError as error:
+            code = error.response.get('Error', {}).get('Code')
+            failed_entries.extend(
+                {"Id": entry["Id"], "SenderFault": True, "Code": code, "Message": str(error)}
+                for entry in entries
+            )
+            continue
+        print(f"Response status code: [{response['ResponseMetadata']['HTTPStatusCode']}]")
+
+        failed_entries.extend(response.get('Failed', []))
+
+    return failed_entries
+
+
 def send_event_to_queue(event, queue_name):
     '''
      Responsável pelo envio do evento para uma fila
     :param event: Evento (dict)
     :param queue_name: Nome da fila (str)
-    :return: None
+    :return: Entradas recusadas pela fila: Id, Message (list)
     '''
 
-    sqs_client = boto3.client("sqs", region_name="us-east-1")
-    response = sqs_client.get_queue_url(
-        QueueName=queue_name
-    )
-    queue_url = response['QueueUrl']
-    response = sqs_client.send_message(
-        QueueUrl=queue_url,
-        MessageBody=json.dumps(event)
-    )
-    print(f"Response status code: [{response['ResponseMetadata']['HTTPStatusCode']}]")
+    return send_events_to_queue([event], queue_name)
 
 
-def create_logger(log_level: logging = logging.INFO) -> logging:
+def _get_log_filename() -> str:
     '''
-    Responsável pela criação do logger
-    :param log_level: Menor level severidade a ser registrado
-    :return: logger (logging)
+    Responsável pelo nome do arquivo de log do dia, recalculado apenas na virada do dia
+    :return: Nome do arquivo de log (str)
     '''
-  
-    logger = logging.getLogger(__name__)
-    logger.setLevel(log_level)
 
-    log_file = f"logger_{datetime.now().strftime('%Y%m%d')}.log"
+    global _LOG_FILE, _LOG_FILE_EXPIRES_AT
+
+    now = time.time()
+    if now >= _LOG_FILE_EXPIRES_AT:
+        today = time.localtime(now)
+        _LOG_FILE = f"logger_{time.strftime('%Y%m%d', today)}.log"
+        _LOG_FILE_EXPIRES_AT = time.mktime(
+            (today.tm_year, today.tm_mon, today.tm_mday + 1, 0, 0, 0, 0, 0, -1)
+        )
+
+    return _LOG_FILE
+
+
+def _create_file_handler(log_level: logging) -> logging.FileHandler:
+    '''
+    Responsável pela criação do handler do arquivo de log do dia
+    :param log_level: Menor level severidade a ser registrado
+    :return: file_handler (logging.FileHandler)
+    '''
 
     folder_path = os.path.join(PATH,LOG_FOLDERNAME)
-    if not os.path.exists(folder_path):
-        os.mkdir(folder_path)
+    os.makedirs(folder_path, exist_ok=True)
     
-    file_handler = logging.FileHandler(os.path.join(folder_path,log_file), mode='a')
+    file_handler = logging.FileHandler(os.path.join(folder_path,_get_log_filename()), mode='a')
     file_handler.setLevel(log_level)
 
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
+    return file_handler
+
+
+def _stop_log_listener() -> None:
+    '''
+    Responsável pela parada do listener do logger, processando os registros ainda na fila
+    :return: None
+    '''
+
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+        _LOG_LISTENER = None
+
+
+def _rotate_log_file() -> None:
+    '''
+    Responsável pela troca do arquivo de log na virada do dia
+    Os registros ainda na fila são gravados no arquivo do dia anterior antes da troca
+    :return: None
+    '''
+
+    listener = _LOG_LISTENER
+    listener.stop()
+
+    previous_handler = _LOG_MEMORY_HANDLER.target
+    _LOG_MEMORY_HANDLER.flush()
+    _LOG_MEMORY_HANDLER.setTarget(_create_file_handler(previous_handler.level))
+    previous_handler.close()
+
+    listener.start()
+
+
+def create_logger(log_level: logging = logging.INFO) -> logging:
+    '''
+    Responsável pela criação do logger, reaproveitado nas chamadas seguintes
+    Na virada do dia, passa a registrar no arquivo de log do novo dia
+    :param log_level: Menor level severidade a ser registrado
+    :return: logger (logging)
+    '''
+        
+    global _LOGGER, _LOG_MEMORY_HANDLER, _LOG_LISTENER
+    if _LOGGER is not None:
+        if time.time() >= _LOG_FILE_EXPIRES_AT:
+            _rotate_log_file()
+        return _LOGGER
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(log_level)
+
+    _LOG_MEMORY_HANDLER = logging.handlers.MemoryHandler(
+        LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=_create_file_handler(log_level),
+        flushOnClose=True
+    )
+
+    log_queue = queue.Queue(-1)
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, _LOG_MEMORY_HANDLER)
+    _LOG_LISTENER.start()
+    atexit.register(_stop_log_listener)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     print("Logger criado com sucesso!")
 
+    _LOGGER = logger
     return logger
 
 
+def _attach_required_sets(schema: dict) -> dict:
+    '''
+    Responsável por anexar aos objetos do schema, inclusive aninhados, o conjunto
+    dos campos obrigatórios, evitando recriá-lo a cada evento
+    :param schema: Schema (dict)
+    :return: schema (dict)
+    '''
+
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if "required" in node:
+            node["_required_set"] = frozenset(node["required"])
+        stack.extend(
+            value for value in node.get("properties", {}).values() if isinstance(value, dict)
+        )
+
+    return schema
+
+
 def read_schema(logger: logging, file: str = SCHEMA_FILENAME, path: str = PATH) -> dict:
     '''
-    Responsável pela leitura do schema
+    Responsável pela leitura do schema, reaproveitando a leitura anterior enquanto o arquivo não for alterado
+    A função de validação do schema é compilada já na leitura
     :param file: Nome do arquivo (str)
     :param path: Caminho do arquivo (str)
     :return: schema (dict)
     '''
 
+    full_path = os.path.abspath(os.path.join(path, file))
+
     try:
-        with open(os.path.join(path, file), "r", encoding='utf-8') as json_file:
-            return json.load(json_file)
+        mtime = os.stat(full_path).st_mtime_ns
+        cached = _SCHEMA_CACHE.get(full_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(full_path, "rb") as json_file:
+            schema = _attach_required_sets(orjson.loads(json_file.read()))
+        get_validator(schema)
+
+        _SCHEMA_CACHE[full_path] = (mtime, schema)
+        if cached is not None:
+            _VALIDATOR_CACHE.pop(id(cached[1]), None)
+        return schema
 
     except FileNotFoundError:
         logger.error("Erro: Arquivo não encontrado.")
      
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error("Erro: Estrutura de dado JSON inválido.")
 
 
 class Validation:
     '''Responsável pela realização das validações do evento'''
+
+    __slots__ = ("event", "logger")
     
     def __init__(self, event: dict, logger: logging) -> None:
         '''
@@ -93,7 +301,7 @@ class Validation:
         self.logger = logger
     
 
-    def _get_custom_type(self, custom_type: str, custom_type_mapping: list = None) -> str:
+    def _get_custom_type(self, custom_type: str, custom_type_mapping: dict = TYPE_MAPPING) -> str:
         '''
         Responsável pelo retorno da tipagem em python da tipagem customizada. Ex: string -> str
         :param custom_type: Tipagem customizada (str)
@@ -101,16 +309,14 @@ class Validation:
         :return: Tipagem em python (str)
         '''
 
-        if not custom_type_mapping:
-            custom_type_mapping = TYPE_MAPPING
-
-        try:
-            return custom_type_mapping[custom_type]
-        except KeyError:
+        mapped_type = custom_type_mapping.get(custom_type)
+        if mapped_type is None:
             self.logger.error(
-                f"Erro: Tipagem customizada do campo não encontrada. Tipo: {custom_type}. "
-                "Favor atualizar a lista: TYPE_MAPPING."
+                "Erro: Tipagem customizada do campo não encontrada. Tipo: %s. "
+                "Favor atualizar a lista: TYPE_MAPPING.",
+                custom_type
             )
+        return mapped_type
 
 
     def validate_event_not_empty(self) -> bool:
@@ -136,7 +342,8 @@ class Validation:
         if not isinstance(self.event, dict):
             self.logger.error(
                 "Erro: Estrutura de dados do evento errada. Esperado: dict. "
-                f"Recebido: {type(self.event).__name__}."
+                "Recebido: %s.",
+                type(self.event).__name__
             )
             return False
         
@@ -154,25 +361,25 @@ class Validation:
         :return: Evento passou por ambas validações? (bool)
         '''
 
-        if not event:
+        if event is None:
             event = self.event
 
-        try:
-            required_fields = set(schema["required"])
-        except KeyError:
-            self.logger.error("Erro: Evento não possui o parâmetro: required.")
-            return False
-        
-        events_fields = set(event.keys())
-        
-        missing_required_fields = required_fields.difference(events_fields)
-        fields_not_required = events_fields.difference(required_fields)
+        required_fields = schema.get("_required_set")
+        if required_fields is None:
+            try:
+                required_fields = frozenset(schema["required"])
+            except KeyError:
+                self.logger.error("Erro: Evento não possui o parâmetro: required.")
+                return False
 
-        if missing_required_fields:
-            self.logger.error(f"Erro: Evento não possui o/s campo/s necessário/s: {missing_required_fields}")
-            return False
-        if fields_not_required:
-            self.logger.error(f"Erro: Campo/s não registrado/s no schema: {fields_not_required}")
+        events_fields = event.keys()
+
+        if events_fields != required_fields:
+            missing_required_fields = required_fields - events_fields
+            if missing_required_fields:
+                self.logger.error("Erro: Evento não possui o/s campo/s necessário/s: %s", missing_required_fields)
+                return False
+            self.logger.error("Erro: Campo/s não registrado/s no schema: %s", events_fields - required_fields)
             return False
         
         self.logger.info("Info: Campos registrados no schema.")
@@ -181,7 +388,8 @@ class Validation:
 
     def validate_event_content(self, schema: dict, event:dict = None) -> bool:
         '''
-        Responsável pela validação do conteúdo do evento, inclusive em dados aninhados 
+        Responsável pela validação do conteúdo do evento, inclusive em dados aninhados,
+        percorridos com uma pilha explícita
         Valida no evento a tipagem dos campos corresponde ao que foi registrado no schema
         Realiza as validações da funcão: compare_event_fields
         :param schema: Schema (dict)
@@ -189,30 +397,105 @@ class Validation:
         :return: Evento passou por todas validações? (bool)
         '''
 
-        if not event:
-            event = self.event
+        stack = [(schema, self.event if event is None else event)]
 
-        if not self.compare_event_fields(schema, event):
-            return False
-        
-        for key, value in event.items():
-            custom_type = self._get_custom_type(custom_type=schema["properties"][key]["type"])
-            if not custom_type:
-                return False
-            if not isinstance(value, custom_type):
-                self.logger.error(
-                    f"Erro: Tipagem do campo divergente do schema. Campo: {key}. "
-                    f"Esperado: {schema['properties'][key]['type']}, Recebido: {type(value).__name__}."
-                )
+        while stack:
+            schema, event = stack.pop()
+
+            if not self.compare_event_fields(schema, event):
                 return False
 
-            if isinstance(value, dict):
-                return self.validate_event_content(schema["properties"][key], value)
-    
+            for key, value in event.items():
+                custom_type = self._get_custom_type(custom_type=schema["properties"][key]["type"])
+                if not custom_type:
+                    return False
+                if not isinstance(value, custom_type):
+                    self.logger.error(
+                        "Erro: Tipagem do campo divergente do schema. Campo: %s. "
+                        "Esperado: %s, Recebido: %s.",
+                        key, schema['properties'][key]['type'], type(value).__name__
+                    )
+                    return False
+
+                if isinstance(value, dict):
+                    stack.append((schema["properties"][key], value))
+
         self.logger.info("Info: Conteúdo do evento validado.")
         return True
     
 
+def compile_validator(schema: dict):
+    '''
+    Responsável pela compilação do schema em uma função de validação, evitando percorrer
+    o schema a cada evento. Realiza as mesmas validações da função: validate_event_content,
+    porém sem registrar o motivo da falha
+    :param schema: Schema (dict)
+    :return: Função de validação: evento (dict) -> Evento passou por todas validações? (bool)
+    '''
+
+    try:
+        required_fields = schema.get("_required_set") or frozenset(schema["required"])
+        checks = []
+        for key in required_fields:
+            field_schema = schema["properties"][key]
+            custom_type = TYPE_MAPPING[field_schema["type"]]
+            nested_validator = compile_validator(field_schema) if custom_type is dict else None
+            checks.append((key, custom_type, nested_validator))
+    except KeyError:
+        return lambda event: False
+
+    checks = tuple(checks)
+
+    def validator(event: dict) -> bool:
+        if event.keys() != required_fields:
+            return False
+        for key, custom_type, nested_validator in checks:
+            value = event[key]
+            if not isinstance(value, custom_type):
+                return False
+            if nested_validator is not None and not nested_validator(value):
+                return False
+        return True
+
+    return validator
+
+
+def get_validator(schema: dict):
+    '''
+    Responsável pela obtenção da função de validação do schema, compilando-a apenas uma vez
+    :param schema: Schema (dict)
+    :return: Função de validação: evento (dict) -> Evento passou por todas validações? (bool)
+    '''
+
+    cached = _VALIDATOR_CACHE.get(id(schema))
+    if cached is None or cached[0] is not schema:
+        cached = _VALIDATOR_CACHE[id(schema)] = (schema, compile_validator(schema))
+    return cached[1]
+
+
+def validate_event(event, logger: logging) -> bool:
+    '''
+    Responsável pelas chamadas dos processos necessários para a validação do evento
+    Utiliza o validador compilado e, em caso de falha, refaz a validação
+    com a classe Validation para registrar o motivo
+    :param event: Evento (dict)
+    :param logger: Logger (logging)
+    :return: Evento passou por todas validações? (bool)
+    '''
+
+    validation = Validation(event, logger)
+
+    if validation.validate_event_not_empty() and validation.validate_event_data_structure():
+        schema = read_schema(logger)
+        if schema:
+            if get_validator(schema)(event):
+                logger.info("Info: Conteúdo do evento validado.")
+                return True
+            return validation.validate_event_content(schema)
+
+    return False
+
+
 def handler(event):
     '''
     Responsável pelas chamadas dos processos necessários para a validação do evento,
@@ -223,11 +506,34 @@ def handler(event):
    
     logger = create_logger()
 
-    validation = Validation(event, logger)
+    if validate_event(event, logger):
+        failed_entries = send_event_to_queue(event, VALID_EVENTS_QUEUE)
+        if failed_entries:
+            logger.error("Erro: Evento recusado pela fila: %s", failed_entries[0].get('Message'))
+        else:
+            logger.info("Sucesso: Evento enviado com sucesso.")
 
-    if validation.validate_event_not_empty() and validation.validate_event_data_structure():
-        schema = read_schema(logger)     
-        if schema:
-            if validation.validate_event_content(schema):
-                send_event_to_queue(event, "valid-events-queue")
-                logger.info("Sucesso: Evento enviado com sucesso.")
+
+def batch_handler(events: list):
+    '''
+    Responsável pela validação de um lote de eventos, enviando para a fila
+    apenas os aprovados, em lotes de até SQS_BATCH_SIZE eventos.
+    :param events: Eventos (list)
+    :return: None
+    '''
+
+    logger = create_logger()
+
+    valid_events = [event for event in events if validate_event(event, logger)]
+
+    if valid_events:
+        failed_entries = send_events_to_queue(valid_events, VALID_EVENTS_QUEUE)
+
+        for failed in failed_entries:
+            logger.error("Erro: Evento recusado pela fila. Id: %s. Motivo: %s", failed['Id'], failed.get('Message'))
+
+        delivered = len(valid_events) - len(failed_entries)
+        if delivered:
+            logger.info("Sucesso: %d evento/s enviado/s com sucesso.", delivered)
+        if failed_entries:
+            logger.error("Erro: %d evento/s recusado/s pela fila.", len(failed_entries))
@@ -1,9 +1,16 @@
+import json
+import logging
+import logging.handlers
 import os
+import threading
+from pathlib import Path
 
 import pytest
+from botocore.exceptions import ClientError
 from unittest.mock import MagicMock
 
-from exercicio1.event_validator import Validation
+from exercicio1 import event_validator
+from exercicio1.event_validator import Validation, compile_validator
 
 PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SCHEMA_FILENAME = "schema.json"
@@ -107,6 +114,58 @@ def get_schema():
 def create_logger():
     yield MagicMock()
 
+class _StubSQSClient:
+    '''
+    Client SQS em memória, que recusa as entradas cujo Id esteja em failed_ids
+    e lança ClientError no envio dos lotes cuja posição esteja em error_batches
+    '''
+
+    def __init__(self, failed_ids=None):
+        self.failed_ids = failed_ids
+        self.error_batches = set()
+        self.batches = []
+
+    def get_queue_url(self, QueueName):
+        return {"QueueUrl": f"https://sqs.us-east-1.amazonaws.com/000000000000/{QueueName}"}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append(Entries)
+        if len(self.batches) - 1 in self.error_batches:
+            raise ClientError(
+                {"Error": {"Code": "AWS.SimpleQueueService.BatchRequestTooLong", "Message": "Lote muito grande"}},
+                "SendMessageBatch"
+            )
+        failed = [
+            {"Id": entry["Id"], "SenderFault": True, "Code": "InvalidMessageContents", "Message": "Recusado"}
+            for entry in Entries if self.failed_ids is None or entry["Id"] in self.failed_ids
+        ]
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}, "Failed": failed}
+
+@pytest.fixture
+def sqs_client(request, monkeypatch):
+    client = _StubSQSClient(getattr(request, "param", ()))
+    monkeypatch.setattr(event_validator, "_SQS_CLIENT", client)
+    monkeypatch.setattr(event_validator, "_QUEUE_URLS", {})
+    yield client
+
+@pytest.fixture
+def queue_logger(monkeypatch):
+    logger = MagicMock()
+    monkeypatch.setattr(event_validator, "create_logger", lambda: logger)
+    yield logger
+
+_VALID_EVENT = {
+    "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+    "documentNumber": "42323235600",
+    "name": "Joseph",
+    "age": 32,
+    "address": {
+        "street": "St. Blue",
+        "number": 3,
+        "mailAddress": True
+        }
+    }
+
 @pytest.fixture
 def create_validation(event: dict, create_logger):
     yield Validation(event, create_logger)
@@ -211,6 +270,22 @@ class TestValidation:
 
         assert not create_validation.validate_event_content(get_schema)
 
+    @pytest.mark.parametrize("event", [{
+        "address": {
+            "street": "St. Blue",
+            "number": 3,
+            "mailAddress": True
+            },
+        "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+        "documentNumber": "42323235600",
+        "name": "Joseph",
+        "age": "32"
+        }
+    ])
+    def test_validate_event_content_field_type_after_nested_field(self, create_validation, get_schema):
+
+        assert not create_validation.validate_event_content(get_schema)
+
     @pytest.mark.parametrize("event", [{
         "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
         "documentNumber": "42323235600",
@@ -225,3 +300,180 @@ class TestValidation:
     ])
     def test_validate_event_content_sucessful(self, create_validation, get_schema):
         assert create_validation.validate_event_content(get_schema)
+
+
+@pytest.mark.validation
+class TestCompileValidator:
+
+    @pytest.mark.parametrize("event, expected", [
+        ({
+            "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+            "documentNumber": "42323235600",
+            "name": "Joseph",
+            "age": 32,
+            "address": {
+                "street": "St. Blue",
+                "number": 3,
+                "mailAddress": True
+                }
+        }, True),
+        ({
+            "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+            "documentNumber": "42323235600",
+            "name": "Joseph",
+            "age": 32,
+        }, False),
+        ({
+            "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+            "documentType": "CPF",
+            "documentNumber": "42323235600",
+            "name": "Joseph",
+            "age": 32,
+            "address": {
+                "street": "St. Blue",
+                "number": 3,
+                "mailAddress": True
+                }
+        }, False),
+        ({
+            "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+            "documentNumber": "42323235600",
+            "name": "Joseph",
+            "age": 32,
+            "address": {
+                "street": "St. Blue",
+                "number": "3",
+                "mailAddress": True
+                }
+        }, False),
+        ({
+            "address": {
+                "street": "St. Blue",
+                "number": 3,
+                "mailAddress": True
+                },
+            "eid": "3e628a05-7a4a-4bf3-8770-084c11601a12",
+            "documentNumber": "42323235600",
+            "name": "Joseph",
+            "age": "32"
+        }, False),
+    ])
+    def test_compile_validator(self, get_schema, event, expected):
+        assert compile_validator(get_schema)(event) is expected
+
+
+@pytest.mark.queue
+class TestSendEventsToQueue:
+
+    def test_send_events_to_queue_batches(self, sqs_client):
+        assert [] == event_validator.send_events_to_queue([_VALID_EVENT] * 23, "valid-events-queue")
+        assert [10, 10, 3] == [len(batch) for batch in sqs_client.batches]
+        for batch in sqs_client.batches:
+            assert len(batch) == len({entry["Id"] for entry in batch})
+
+    @pytest.mark.parametrize("sqs_client", [None], indirect=True)
+    def test_handler_failed_event_not_reported_as_sent(self, sqs_client, queue_logger):
+        event_validator.handler(_VALID_EVENT)
+        assert 1 == len(sqs_client.batches)
+        assert ("Sucesso: Evento enviado com sucesso.",) not in [c.args for c in queue_logger.info.call_args_list]
+        queue_logger.error.assert_called_with("Erro: Evento recusado pela fila: %s", "Recusado")
+
+    @pytest.mark.parametrize("sqs_client", [None], indirect=True)
+    def test_batch_handler_failed_events_not_reported_as_sent(self, sqs_client, queue_logger):
+        event_validator.batch_handler([_VALID_EVENT] * 23)
+        assert [10, 10, 3] == [len(batch) for batch in sqs_client.batches]
+        assert not [c for c in queue_logger.info.call_args_list if c.args[0].startswith("Sucesso")]
+        queue_logger.error.assert_any_call("Erro: %d evento/s recusado/s pela fila.", 23)
+
+    @pytest.mark.parametrize("sqs_client", [{"0", "15"}], indirect=True)
+    def test_batch_handler_partial_failure(self, sqs_client, queue_logger):
+        event_validator.batch_handler([_VALID_EVENT] * 23)
+        queue_logger.info.assert_any_call("Sucesso: %d evento/s enviado/s com sucesso.", 21)
+        queue_logger.error.assert_any_call("Erro: %d evento/s recusado/s pela fila.", 2)
+
+    def test_send_events_to_queue_splits_by_size(self, sqs_client, monkeypatch):
+        body_bytes = len(event_validator._serialize_event(_VALID_EVENT).encode())
+        monkeypatch.setattr(event_validator, "SQS_MAX_BATCH_BYTES", body_bytes * 4)
+        assert [] == event_validator.send_events_to_queue([_VALID_EVENT] * 10, "valid-events-queue")
+        assert [4, 4, 2] == [len(batch) for batch in sqs_client.batches]
+
+    def test_batch_handler_client_error_on_one_batch(self, sqs_client, queue_logger):
+        sqs_client.error_batches = {1}
+        event_validator.batch_handler([_VALID_EVENT] * 23)
+        assert [10, 10, 3] == [len(batch) for batch in sqs_client.batches]
+        queue_logger.info.assert_any_call("Sucesso: %d evento/s enviado/s com sucesso.", 13)
+        queue_logger.error.assert_any_call("Erro: %d evento/s recusado/s pela fila.", 10)
+
+    def test_send_events_to_queue_integer_above_64_bits(self, sqs_client):
+        events = [dict(_VALID_EVENT, age=2 ** 64), _VALID_EVENT]
+        assert [] == event_validator.send_events_to_queue(events, "valid-events-queue")
+        assert [json.loads(entry["MessageBody"]) for entry in sqs_client.batches[0]] == events
+
+
+@pytest.mark.schema
+class TestReadSchema:
+
+    def test_read_schema_replaces_stale_entry(self, tmp_path, create_logger, monkeypatch):
+        monkeypatch.setattr(event_validator, "_SCHEMA_CACHE", {})
+        monkeypatch.setattr(event_validator, "_VALIDATOR_CACHE", {})
+        schema_file = tmp_path / SCHEMA_FILENAME
+        schema_file.write_bytes(Path(PATH, SCHEMA_FILENAME).read_bytes())
+
+        first = event_validator.read_schema(create_logger, path=str(tmp_path))
+        assert first is event_validator.read_schema(create_logger, path=str(tmp_path))
+
+        stat = schema_file.stat()
+        os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = event_validator.read_schema(create_logger, path=str(tmp_path))
+
+        assert second is not first
+        assert [str(schema_file)] == list(event_validator._SCHEMA_CACHE)
+        assert (stat.st_mtime_ns + 1_000_000_000, second) == event_validator._SCHEMA_CACHE[str(schema_file)]
+        assert id(first) not in event_validator._VALIDATOR_CACHE
+        assert id(second) in event_validator._VALIDATOR_CACHE
+
+
+@pytest.mark.logger
+class TestCreateLogger:
+
+    def test_create_logger_rollover_keeps_queued_records_in_previous_file(self, tmp_path, monkeypatch):
+        log_filenames = iter(["logger_day1.log", "logger_day2.log"])
+        monkeypatch.setattr(event_validator, "PATH", str(tmp_path))
+        monkeypatch.setattr(event_validator, "_get_log_filename", lambda: next(log_filenames))
+        monkeypatch.setattr(event_validator, "_LOGGER", None)
+        monkeypatch.setattr(event_validator, "_LOG_MEMORY_HANDLER", None)
+        monkeypatch.setattr(event_validator, "_LOG_LISTENER", None)
+        monkeypatch.setattr(event_validator, "_LOG_FILE_EXPIRES_AT", float("inf"))
+        monkeypatch.setattr(logging.getLogger(event_validator.__name__), "handlers", [])
+
+        # Segura o listener até depois da virada, para que os registros do dia anterior ainda estejam na fila
+        listener_gate = threading.Event()
+        dequeue = logging.handlers.QueueListener.dequeue
+        monkeypatch.setattr(
+            logging.handlers.QueueListener, "dequeue",
+            lambda listener, block: listener_gate.wait() and dequeue(listener, block)
+        )
+
+        logger = event_validator.create_logger()
+        for index in range(500):
+            logger.info("Info: registro do dia anterior %d.", index)
+        logger.error("Erro: Evento vazio.")
+
+        threading.Timer(0.2, listener_gate.set).start()
+        monkeypatch.setattr(event_validator, "_LOG_FILE_EXPIRES_AT", 0.0)
+        assert logger is event_validator.create_logger()
+        monkeypatch.setattr(event_validator, "_LOG_FILE_EXPIRES_AT", float("inf"))
+        logger.info("Info: registro do novo dia.")
+
+        event_validator._stop_log_listener()
+        target = event_validator._LOG_MEMORY_HANDLER.target
+        event_validator._LOG_MEMORY_HANDLER.close()
+        target.close()
+
+        day1 = (tmp_path / event_validator.LOG_FOLDERNAME / "logger_day1.log").read_text()
+        day2 = (tmp_path / event_validator.LOG_FOLDERNAME / "logger_day2.log").read_text()
+        assert 500 == day1.count("registro do dia anterior")
+        assert "ERROR - Erro: Evento vazio." in day1
+        assert "registro do novo dia" not in day1
+        assert "registro do dia anterior" not in day2
+        assert "Info: registro do novo dia." in day2
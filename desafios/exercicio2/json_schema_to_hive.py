@@ -1,13 +1,23 @@
-from datetime import datetime
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import time
 
-import json
+import orjson
 
 _ATHENA_CLIENT = None
+_LOGGER = None
+_LOG_MEMORY_HANDLER = None
+_LOG_LISTENER = None
+_LOG_FILE = None
+_LOG_FILE_EXPIRES_AT = 0.0
+_SCHEMA_CACHE = {}
 
 PATH = os.path.dirname(os.path.abspath(__file__))
 LOG_FOLDERNAME = "logs"
+LOG_BUFFER_CAPACITY = 1000
 SCHEMA_FILENAME = "schema.json"
 TYPE_MAPPING = {
     "string": "varchar",
@@ -31,57 +41,145 @@ def create_hive_table_with_athena(query):
         }
     )
 
-def create_logger(log_level: logging = logging.INFO) -> logging:
+def _get_log_filename() -> str:
     '''
-    Responsável pela criação do logger
-    :param log_level: Menor level severidade a ser registrado
-    :return: logger (logging)
+    Responsável pelo nome do arquivo de log do dia, recalculado apenas na virada do dia
+    :return: Nome do arquivo de log (str)
     '''
-        
-    logger = logging.getLogger(__name__)
-    logger.setLevel(log_level)
 
-    log_file = f"logger_{datetime.now().strftime('%Y%m%d')}.log"
+    global _LOG_FILE, _LOG_FILE_EXPIRES_AT
+
+    now = time.time()
+    if now >= _LOG_FILE_EXPIRES_AT:
+        today = time.localtime(now)
+        _LOG_FILE = f"logger_{time.strftime('%Y%m%d', today)}.log"
+        _LOG_FILE_EXPIRES_AT = time.mktime(
+            (today.tm_year, today.tm_mon, today.tm_mday + 1, 0, 0, 0, 0, 0, -1)
+        )
+
+    return _LOG_FILE
+
+
+def _create_file_handler(log_level: logging) -> logging.FileHandler:
+    '''
+    Responsável pela criação do handler do arquivo de log do dia
+    :param log_level: Menor level severidade a ser registrado
+    :return: file_handler (logging.FileHandler)
+    '''
 
     folder_path = os.path.join(PATH,LOG_FOLDERNAME)
-    if not os.path.exists(folder_path):
-        os.mkdir(folder_path)
+    os.makedirs(folder_path, exist_ok=True)
     
-    file_handler = logging.FileHandler(os.path.join(folder_path,log_file), mode='a')
+    file_handler = logging.FileHandler(os.path.join(folder_path,_get_log_filename()), mode='a')
     file_handler.setLevel(log_level)
 
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
+    return file_handler
+
+
+def _stop_log_listener() -> None:
+    '''
+    Responsável pela parada do listener do logger, processando os registros ainda na fila
+    :return: None
+    '''
+
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+        _LOG_LISTENER = None
+
+
+def _rotate_log_file() -> None:
+    '''
+    Responsável pela troca do arquivo de log na virada do dia
+    Os registros ainda na fila são gravados no arquivo do dia anterior antes da troca
+    :return: None
+    '''
+
+    listener = _LOG_LISTENER
+    listener.stop()
+
+    previous_handler = _LOG_MEMORY_HANDLER.target
+    _LOG_MEMORY_HANDLER.flush()
+    _LOG_MEMORY_HANDLER.setTarget(_create_file_handler(previous_handler.level))
+    previous_handler.close()
+
+    listener.start()
+
+
+def create_logger(log_level: logging = logging.INFO) -> logging:
+    '''
+    Responsável pela criação do logger, reaproveitado nas chamadas seguintes
+    Na virada do dia, passa a registrar no arquivo de log do novo dia
+    :param log_level: Menor level severidade a ser registrado
+    :return: logger (logging)
+    '''
+        
+    global _LOGGER, _LOG_MEMORY_HANDLER, _LOG_LISTENER
+    if _LOGGER is not None:
+        if time.time() >= _LOG_FILE_EXPIRES_AT:
+            _rotate_log_file()
+        return _LOGGER
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(log_level)
+
+    _LOG_MEMORY_HANDLER = logging.handlers.MemoryHandler(
+        LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=_create_file_handler(log_level),
+        flushOnClose=True
+    )
+
+    log_queue = queue.Queue(-1)
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, _LOG_MEMORY_HANDLER)
+    _LOG_LISTENER.start()
+    atexit.register(_stop_log_listener)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     print("Logger criado com sucesso!")
 
+    _LOGGER = logger
     return logger
 
 
 def read_schema(logger: logging, file: str = SCHEMA_FILENAME, path: str = PATH) -> dict:
     '''
-    Responsável pela leitura do schema
+    Responsável pela leitura do schema, reaproveitando a leitura anterior enquanto o arquivo não for alterado
     :param file: Nome do arquivo (str)
     :param path: Caminho do arquivo (str)
     :return: schema (dict)
     '''
 
+    full_path = os.path.abspath(os.path.join(path, file))
+
     try:
-        with open(os.path.join(path, file), "r", encoding="utf-8") as json_file:
-            return json.load(json_file)
+        mtime = os.stat(full_path).st_mtime_ns
+        cached = _SCHEMA_CACHE.get(full_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(full_path, "rb") as json_file:
+            schema = orjson.loads(json_file.read())
+
+        _SCHEMA_CACHE[full_path] = (mtime, schema)
+        return schema
 
     except FileNotFoundError:
         logger.error("Erro: Arquivo não encontrado.")
      
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error("Erro: Estrutura de dado JSON inválido.")
 
 
 class Query:
     '''Reponsável pela geração da query'''
 
+    __slots__ = ("tb_name", "db_name", "logger")
+
     def __init__(self, tb_name : str, db_name : str, logger: logging) -> None:
         '''
         Inicializa a classe
@@ -96,23 +194,21 @@ class Query:
         self.logger = logger
 
 
-    def _get_custom_type(self, custom_type: str, custom_type_mapping: dict = None):
+    def _get_custom_type(self, custom_type: str, custom_type_mapping: dict = TYPE_MAPPING):
         '''
         Responsável pelo retorno da tipagem em python da tipagem customizada. Ex: string -> str
         :param custom_type: Tipagem customizada (str)
         :param custom_type_mapping: Mapeamento da tipagem customizada (str)
         :return: Tipagem em python (str)
         '''
-        if not custom_type_mapping:
-            custom_type_mapping = TYPE_MAPPING
-
-        try:
-            return custom_type_mapping[custom_type]
-        except KeyError:
+        mapped_type = custom_type_mapping.get(custom_type)
+        if mapped_type is None:
             self.logger.error(
-                f"Erro: Tipagem customizada do campo não encontrada. Tipo: {custom_type}. "
-                "Favor atualizar a lista: TYPE_MAPPING."
+                "Erro: Tipagem customizada do campo não encontrada. Tipo: %s. "
+                "Favor atualizar a lista: TYPE_MAPPING.",
+                custom_type
             )
+        return mapped_type
     
 
     def create_table(
@@ -145,57 +241,59 @@ class Query:
         
         self.logger.info("Info: Início da montagem da query de criação de tabelas.")
         
-        query = f"CREATE EXTERNAL TABLE IF NOT EXISTS {self.db_name}.{self.tb_name}"
+        query_parts = [f"CREATE EXTERNAL TABLE IF NOT EXISTS {self.db_name}.{self.tb_name}"]
         self.logger.info("Info: Incluido: Nome do database e da tabela.")
         
         if col_params:
             col_params = self.format_table_columns(col_params)
-            query+=f"\n({col_params})"
+            query_parts.append(f"({col_params})")
             self.logger.info("Info: Incluido: Informação das colunas.")
         
         if tb_desc:
-            query+=f"\nCOMMENT '{tb_desc}'"
+            query_parts.append(f"COMMENT '{tb_desc}'")
             self.logger.info("Info: Incluido: Comentário da tabela.")
         
         if partition_params:
             partition_params = self.format_table_columns(partition_params) 
-            query+=f"\nPARTITIONED BY ({partition_params})"
+            query_parts.append(f"PARTITIONED BY ({partition_params})")
             self.logger.info("Info: Incluido: Configuração de partição da tabela.")
         
         if clustering_params or num_buckets:
             if clustering_params and num_buckets:
                 clustering_params = ",".join(clustering_params)
-                query+=f"\nCLUSTERED BY ({clustering_params}) INTO {num_buckets} BUCKETS"
+                query_parts.append(f"CLUSTERED BY ({clustering_params}) INTO {num_buckets} BUCKETS")
                 self.logger.info("Info: Incluido: Configuração de clusterização da tabela.")
             else:
-                self.logger.warning("""Atenção: Configuração de clusterização necessita de ambos 
-                                parâmetros: Coluna/s: {clustering_params},
-                                Número de buckets: {num_buckets}.""")
+                self.logger.warning(
+                    "Atenção: Configuração de clusterização necessita de ambos parâmetros: "
+                    "Coluna/s: %s, Número de buckets: %s.",
+                    clustering_params, num_buckets
+                )
         
         if row_format:
-            query+=f"\nROW FORMAT '{row_format}'"
+            query_parts.append(f"ROW FORMAT '{row_format}'")
             self.logger.info("Info: Incluido: Configuração de formato de linha da tabela.")
         
         if file_format:
-            query+=f"\nSTORED AS {file_format}"
+            query_parts.append(f"STORED AS {file_format}")
             self.logger.info("Info: Incluido: Configuração de formato de arquivo da tabela.")
         
         if serde_properties:
-            serde_properties = self.format_table_properties(serde_properties)
-            query+=f"\nWITH SERDEPROPERTIES ({serde_properties})"
+            query_parts.append(f"WITH SERDEPROPERTIES ({self.format_table_properties(serde_properties)})")
             self.logger.info("Info: Incluido: Propriedades da linha da tabela.")
         
         if location:
-            query+=f"\nLOCATION '{location}'"
+            query_parts.append(f"LOCATION '{location}'")
             self.logger.info("Info: Incluido: Configuração de local da tabela.")
         
         if tbl_properties:
-            tbl_properties = self.format_table_properties(tbl_properties)
-            query+=f"\nTBLPROPERTIES ({tbl_properties})"
+            query_parts.append(f"TBLPROPERTIES ({self.format_table_properties(tbl_properties)})")
             self.logger.info("Info: Incluido: Propriedades da tabela.")
         
+        query = "\n".join(query_parts)
+
         self.logger.info("Info: Fim da montagem da query de criação de tabelas")
-        self.logger.info(f"Info: Query: {query}")
+        self.logger.info("Info: Query: %s", query)
         return query
     
 
@@ -203,40 +301,62 @@ class Query:
         '''
         Responsável pela formatação dos dados de coluna: 
             nome separator tipo<nome tipo> COMMENT comentário
+        Colunas aninhadas (object) são percorridas com uma pilha explícita
         :param col_dict: Informações de colunas: nome, tipo, comentário (dict)
         :param separator: Separador entre o nome e tipo (str). Ex: nome tipo, nome: tipo
         :return: Formatação das colunas (str)
         '''
         
         col_data_list = []
-        for key, value in col_dict.items():
-        
-            try:
-                col_data = f"{key}{separator} {self._get_custom_type(value['type'])}"
-            except NameError:
-                self.logger.error("Erro: Dicionário de colunas não possui o campo: 'type'")
-        
-            if value['type'] == 'object':
+        stack = [(iter(col_dict.items()), separator, col_data_list, None)]
+
+        while stack:
+            columns, col_separator, formatted_columns, parent = stack[-1]
+
+            for key, value in columns:
+
                 try:
-                    obj_columns = self.format_table_columns(value['properties'], separator=':')
-                except NameError:
-                    self.logger.error("Erro: Dicionário de colunas não possui o campo: 'properties'")
-                    
-                col_data += f" <{obj_columns}>"
-            
-            try:
-                comment = value['description']
-            except NameError:
-                self.logger.error("Erro: Dicionário de colunas não possui o campo: 'description'")
-                
-            if comment:
-                col_data += f" COMMENT '{comment}'"
-                
-            col_data_list.append(col_data)
+                    col_data = f"{key}{col_separator} {self._get_custom_type(value['type'])}"
+                except KeyError:
+                    self.logger.error("Erro: Dicionário de colunas não possui o campo: 'type'")
+                    continue
+
+                if value['type'] == 'object':
+                    try:
+                        obj_columns = value['properties']
+                    except KeyError:
+                        self.logger.error("Erro: Dicionário de colunas não possui o campo: 'properties'")
+                        continue
+
+                    stack.append((iter(obj_columns.items()), ":", [], (col_data, value, formatted_columns)))
+                    break
+
+                formatted_columns.append(self._format_column_comment(col_data, value))
+
+            else:
+                stack.pop()
+                if parent:
+                    col_data, value, parent_columns = parent
+                    obj_columns = ",\n".join(formatted_columns)
+                    parent_columns.append(self._format_column_comment(f"{col_data} <{obj_columns}>", value))
             
         return ",\n".join(col_data_list)
     
 
+    def _format_column_comment(self, col_data: str, col_info: dict) -> str:
+        '''
+        Responsável pela inclusão do comentário na formatação da coluna, caso exista
+        :param col_data: Formatação da coluna (str)
+        :param col_info: Informações da coluna: tipo, comentário (dict)
+        :return: Formatação da coluna com comentário (str)
+        '''
+
+        comment = col_info.get('description')
+        if comment:
+            col_data += f" COMMENT '{comment}'"
+        return col_data
+    
+
     def format_table_properties(self, tb_properties: dict) -> str:
         '''
         Responsável pela formatação das propriedades da tabela 
@@ -249,6 +369,8 @@ class Query:
 class Schema():
     '''Responsável pela obtenção de dados do schema'''
 
+    __slots__ = ("schema", "logger")
+
     def __init__(self, schema: dict, logger: logging) -> None:
         '''
         Inicializa a classe
@@ -265,7 +387,7 @@ class Schema():
         '''
         Responsável pela obtenção dos dados das colunas (aninhadas)
         :param schema: Schema (dict)
-        :param filtered_col: Filtra as colunas a serem obtidas (list)
+        :param filtered_col: Filtra as colunas a serem obtidas, sem alterar o schema (list)
         :return: Dados das colunas (dict)
         '''
 
@@ -273,12 +395,14 @@ class Schema():
         if not schema:
             schema = self.schema
 
-        if filtered_col:
-            schema["properties"] = {key: schema["properties"][key] for key in filtered_col}
-            self.logger.info(f"Info: Filtrado a coleta de dados para a/s coluna/s: {filtered_col}")
+        if filtered_col is not None:
+            columns = ((key, schema["properties"][key]) for key in filtered_col)
+            self.logger.info("Info: Filtrado a coleta de dados para a/s coluna/s: %s", filtered_col)
+        else:
+            columns = schema["properties"].items()
 
         col_dict = {}
-        for key, value in schema["properties"].items():
+        for key, value in columns:
             col_dict[key] = {"type":value["type"], "description":value["description"]}
             if value["type"] == "object":
                 col_dict[key] = dict(col_dict[key], **{"properties":self.get_col_data(schema=value)})